@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+현대카드 자동화 산출물 저장소
+실행별 산출물(HTML, ZIP, 디버그 파일)을 해시 기준으로 보관하고
+용량/보관기간 제한을 LRU 방식으로 유지합니다.
+
+저장 구조:
+    <root>/manifest.json
+    <root>/objects/<sha256>.<확장자>
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 동작
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 기본 저장 경로
+DEFAULT_ARTIFACT_PATH = os.path.join(os.path.expanduser("~"), "Downloads", "hyundai_auto", "artifacts")
+
+# 기본 제한 (환경변수로 변경 가능)
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_DAYS = 30
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """파일 SHA-256 해시 계산"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """용량/기간 제한이 있는 산출물 저장소"""
+
+    MANIFEST_NAME = 'manifest.json'
+    LOCK_NAME = 'manifest.lock'
+
+    def __init__(self, root=None, max_bytes=None, max_age_days=None):
+        self.root = Path(root or os.environ.get('HYUNDAI_ARTIFACT_PATH') or DEFAULT_ARTIFACT_PATH)
+        self.objects_path = self.root / 'objects'
+        self.manifest_path = self.root / self.MANIFEST_NAME
+        self.lock_path = self.root / self.LOCK_NAME
+        self.objects_path.mkdir(parents=True, exist_ok=True)
+
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('HYUNDAI_ARTIFACT_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024
+        if max_age_days is None:
+            max_age_days = float(os.environ.get('HYUNDAI_ARTIFACT_MAX_DAYS', DEFAULT_MAX_DAYS))
+
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.entries = self._load_manifest()
+
+    def _load_manifest(self):
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"매니페스트 로드 실패, 새로 생성합니다: {e}")
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        """매니페스트 배타 잠금 (동시 실행 간 갱신 유실 방지)
+
+        잠금을 잡은 뒤 매니페스트를 다시 읽으므로, 블록 안에서
+        self.entries를 수정하고 _save_manifest()로 저장하면 됩니다.
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.entries = self._load_manifest()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_manifest(self):
+        # 임시 파일에 쓴 뒤 교체
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def total_bytes(self):
+        """보관 중인 산출물 총 용량"""
+        return sum(entry['size'] for entry in self.entries.values())
+
+    def add(self, file_path, run_id, message_id=None):
+        """산출물 추가 (같은 내용은 한 번만 저장)"""
+        file_path = Path(file_path)
+        sha256 = file_sha256(file_path)
+
+        with self._locked():
+            now = time.time()
+            entry = self.entries.get(sha256)
+            if entry is None:
+                object_path = self.objects_path / f"{sha256}{file_path.suffix}"
+                shutil.copy2(file_path, object_path)
+                entry = {
+                    'object': object_path.name,
+                    'size': object_path.stat().st_size,
+                    'created_at': now,
+                    'runs': [],
+                }
+                self.entries[sha256] = entry
+
+            entry['last_access'] = now
+            entry['runs'].append({
+                'run_id': run_id,
+                'message_id': message_id,
+                'name': file_path.name,
+            })
+
+            self._save_manifest()
+            return str(self.objects_path / entry['object'])
+
+    def get(self, sha256):
+        """해시로 산출물 경로 조회 (LRU 접근 시각 갱신)"""
+        with self._locked():
+            entry = self.entries.get(sha256)
+            if entry is None:
+                return None
+
+            entry['last_access'] = time.time()
+            self._save_manifest()
+            return str(self.objects_path / entry['object'])
+
+    def find(self, run_id=None, message_id=None):
+        """실행 ID/메시지 ID로 산출물 검색"""
+        self.entries = self._load_manifest()
+
+        result = []
+        for sha256, entry in self.entries.items():
+            for ref in entry['runs']:
+                if run_id and ref['run_id'] != run_id:
+                    continue
+                if message_id and ref['message_id'] != message_id:
+                    continue
+                result.append({'sha256': sha256, 'path': str(self.objects_path / entry['object']), **ref})
+        return result
+
+    def _evict(self, sha256):
+        entry = self.entries.pop(sha256)
+        object_path = self.objects_path / entry['object']
+        if object_path.exists():
+            object_path.unlink()
+        return entry
+
+    def enforce_limits(self):
+        """오래 안 쓴 산출물 삭제 후 용량 초과분을 오래 안 쓴 순으로 삭제"""
+        with self._locked():
+            evicted = []
+            cutoff = time.time() - self.max_age_days * 86400
+
+            # 보관기간은 마지막 사용(추가/조회) 시각 기준
+            for sha256 in [k for k, v in self.entries.items() if v['last_access'] < cutoff]:
+                self._evict(sha256)
+                evicted.append(sha256)
+
+            total = self.total_bytes()
+            for sha256 in sorted(self.entries, key=lambda k: self.entries[k]['last_access']):
+                if total <= self.max_bytes:
+                    break
+                total -= self._evict(sha256)['size']
+                evicted.append(sha256)
+
+            # 매니페스트에 없는 객체 파일 정리 (잠금 도입 전 유실된 항목 등)
+            known = {entry['object'] for entry in self.entries.values()}
+            for object_path in self.objects_path.iterdir():
+                if object_path.name not in known:
+                    object_path.unlink()
+                    evicted.append(object_path.name)
+
+            if evicted:
+                self._save_manifest()
+                logger.info(f"🧹 산출물 {len(evicted)}개 정리 (보관 용량: {total // 1024}KB)")
+
+            return len(evicted)
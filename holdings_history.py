@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+현대카드 보유내역 히스토리 저장소
+일별 보유내역 스냅샷을 명세일자별 Parquet 파티션으로 보관하고 조회합니다.
+
+저장 구조:
+    <root>/statement_date=2025-10-22/holdings.parquet
+    <root>/statement_date=2025-10-23/holdings.parquet
+"""
+
+import os
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# 기본 저장 경로
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), "Downloads", "hyundai_auto", "history")
+
+# 카드/사원 컬럼 탐지 키워드 (앞쪽이 우선)
+CARD_COLUMN_KEYWORDS = ('카드번호', '카드')
+EMPLOYEE_COLUMN_KEYWORDS = ('사원', '사번', '직원', '성명', '이름', '사용자')
+
+# 증감 비교 결과 컬럼
+CHANGE_COLUMN = '변동구분'
+
+def find_column(columns, keywords):
+    """키워드가 포함된 첫 번째 컬럼명 찾기"""
+    for keyword in keywords:
+        for column in columns:
+            if keyword in str(column):
+                return column
+    return None
+
+def _to_text(series):
+    """식별자 컬럼을 문자열로 변환 (엑셀이 숫자로 읽은 카드번호 등)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pd.api.types.is_float_dtype(series):
+        # 결측값 때문에 float이 된 정수 컬럼은 '1111.0'이 되지 않도록 정수로 변환
+        non_null = series.dropna()
+        if (non_null == non_null.round()).all():
+            series = series.astype('Int64')
+    return series.astype(object).map(lambda v: v if pd.isna(v) else str(v))
+
+def _filter_value(field_type, value):
+    """파티션 컬럼 타입에 맞는 필터 값 (변환할 수 없으면 None)"""
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    try:
+        if pa.types.is_integer(field_type):
+            return int(value)
+        if pa.types.is_floating(field_type):
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+def _to_date(value):
+    """문자열/datetime을 date로 변환"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+class HoldingsHistoryStore:
+    """일별 보유내역 스냅샷 저장소"""
+
+    PARTITION_PREFIX = 'statement_date='
+    FILE_NAME = 'holdings.parquet'
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get('HYUNDAI_HISTORY_PATH') or DEFAULT_HISTORY_PATH)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _partition_file(self, statement_date):
+        return self.root / f"{self.PARTITION_PREFIX}{_to_date(statement_date).isoformat()}" / self.FILE_NAME
+
+    def append(self, df, statement_date):
+        """스냅샷 저장 (같은 명세일자는 덮어쓰기)"""
+        statement_date = _to_date(statement_date)
+
+        data = df.copy()
+        data.columns = [str(column) for column in data.columns]
+
+        # 엑셀의 혼합 타입 컬럼은 문자열로 통일
+        for column in data.columns:
+            if data[column].dtype == object:
+                data[column] = data[column].map(lambda v: v if pd.isna(v) else str(v))
+
+        # 카드/사원 컬럼은 항상 문자열로 저장
+        key_columns = [find_column(data.columns, keywords) for keywords in (CARD_COLUMN_KEYWORDS, EMPLOYEE_COLUMN_KEYWORDS)]
+        key_columns = [column for column in key_columns if column is not None]
+        for column in key_columns:
+            data[column] = _to_text(data[column])
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+
+        # 카드/사원 컬럼은 딕셔너리 인코딩
+        for column in key_columns:
+            index = table.schema.get_field_index(column)
+            field_type = table.schema.field(index).type
+            if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+                table = table.set_column(index, column, table.column(index).dictionary_encode())
+
+        # 임시 파일에 쓴 뒤 교체
+        path = self._partition_file(statement_date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+
+        logger.info(f"📚 히스토리 저장: {statement_date} ({len(data)}행)")
+        return str(path)
+
+    def dates(self):
+        """저장된 명세일자 목록 (오름차순)"""
+        result = []
+        for partition in self.root.glob(f"{self.PARTITION_PREFIX}*"):
+            if (partition / self.FILE_NAME).exists():
+                result.append(date.fromisoformat(partition.name[len(self.PARTITION_PREFIX):]))
+        return sorted(result)
+
+    def columns(self, statement_date=None):
+        """스냅샷 컬럼 목록 (파일 footer만 읽음)"""
+        dates = self.dates()
+        if not dates:
+            return []
+        statement_date = _to_date(statement_date) if statement_date else dates[-1]
+        return pq.read_schema(self._partition_file(statement_date)).names
+
+    def read(self, statement_date, columns=None, filters=None):
+        """특정 명세일자 스냅샷 조회"""
+        path = self._partition_file(statement_date)
+        if not path.exists():
+            raise FileNotFoundError(f"{_to_date(statement_date)} 스냅샷이 없습니다: {path}")
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+    def _dates_between(self, start=None, end=None):
+        start = _to_date(start) if start else None
+        end = _to_date(end) if end else None
+        return [
+            d for d in self.dates()
+            if not (start and d < start) and not (end and d > end)
+        ]
+
+    def read_range(self, start=None, end=None, columns=None, filters=None):
+        """기간 내 스냅샷을 명세일자 컬럼과 함께 조회"""
+        frames = []
+        for statement_date in self._dates_between(start, end):
+            # 파티션마다 스키마가 다를 수 있어 있는 컬럼만 읽음
+            available = self.columns(statement_date)
+            wanted = [c for c in columns if c in available] if columns else None
+
+            frame = self.read(statement_date, columns=wanted, filters=filters)
+            frame.insert(0, 'statement_date', statement_date)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def card_history(self, card_no, columns=None, start=None, end=None):
+        """카드별 보유내역 이력 조회"""
+        # 결과 카드 컬럼명은 최신 스냅샷 기준
+        latest_column = find_column(self.columns(), CARD_COLUMN_KEYWORDS)
+        if latest_column is None:
+            raise ValueError("카드 컬럼을 찾을 수 없습니다.")
+
+        frames = []
+        for statement_date in self._dates_between(start, end):
+            # 파티션마다 카드 컬럼명/타입이 다를 수 있어 개별 확인
+            schema = pq.read_schema(self._partition_file(statement_date))
+            card_column = find_column(schema.names, CARD_COLUMN_KEYWORDS)
+            if card_column is None:
+                continue
+            value = _filter_value(schema.field(card_column).type, card_no)
+            if value is None:
+                continue
+
+            wanted = None
+            if columns:
+                wanted = [card_column] + [c for c in columns if c in schema.names and c != card_column]
+
+            frame = self.read(statement_date, columns=wanted, filters=[(card_column, '==', value)])
+            frame[card_column] = _to_text(frame[card_column])
+            frame = frame.rename(columns={card_column: latest_column})
+            frame.insert(0, 'statement_date', statement_date)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def daily_delta(self, statement_date=None, value_columns=None):
+        """직전 명세일자 대비 카드별 증감 조회"""
+        dates = self.dates()
+        statement_date = _to_date(statement_date) if statement_date else (dates[-1] if dates else None)
+        previous_dates = [d for d in dates if statement_date and d < statement_date]
+
+        if statement_date not in dates or not previous_dates:
+            raise ValueError(f"{statement_date} 이전 스냅샷이 없어 비교할 수 없습니다.")
+        previous_date = previous_dates[-1]
+
+        card_column = find_column(self.columns(statement_date), CARD_COLUMN_KEYWORDS)
+        if card_column is None:
+            raise ValueError("카드 컬럼을 찾을 수 없습니다.")
+
+        # 숫자 컬럼만 비교 (지정하지 않은 경우)
+        if value_columns is None:
+            schema = pq.read_schema(self._partition_file(statement_date))
+            value_columns = [
+                field.name for field in schema
+                if field.name != card_column and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+            ]
+
+        def load(target_date):
+            available = self.columns(target_date)
+            # 이전 스냅샷의 카드 컬럼명이 다르면 현재 이름으로 맞춤
+            source_column = find_column(available, CARD_COLUMN_KEYWORDS)
+            if source_column is None:
+                raise ValueError(f"{target_date} 스냅샷에서 카드 컬럼을 찾을 수 없습니다.")
+            wanted = [source_column] + [c for c in value_columns if c in available and c != source_column]
+            frame = self.read(target_date, columns=wanted).rename(columns={source_column: card_column})
+            frame[card_column] = _to_text(frame[card_column])
+            # 카드 한 장이 여러 행이면 합산
+            return frame.groupby(card_column, as_index=False).sum(numeric_only=True)
+
+        current = load(statement_date)
+        previous = load(previous_date)
+
+        merged = previous.merge(
+            current, on=card_column, how='outer', suffixes=('_이전', '_현재'), indicator=True
+        )
+
+        changed = pd.Series(False, index=merged.index)
+        for column in value_columns:
+            before, after = f"{column}_이전", f"{column}_현재"
+            if before not in merged or after not in merged:
+                continue
+            merged[f"{column}_증감"] = merged[after].fillna(0) - merged[before].fillna(0)
+            changed |= merged[f"{column}_증감"] != 0
+
+        merged[CHANGE_COLUMN] = '동일'
+        merged.loc[changed, CHANGE_COLUMN] = '변경'
+        merged.loc[merged['_merge'] == 'right_only', CHANGE_COLUMN] = '신규'
+        merged.loc[merged['_merge'] == 'left_only', CHANGE_COLUMN] = '해지'
+        merged = merged.drop(columns='_merge')
+
+        merged.attrs['statement_date'] = statement_date
+        merged.attrs['previous_date'] = previous_date
+        return merged
@@ -9,31 +9,43 @@ import os
 import sys
 import time
 import zipfile
-import pandas as pd
 import base64
 import pickle
 import json
+import importlib
 from pathlib import Path
 import logging
-from datetime import datetime
-
-# 라이브러리 import
-try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.common.keys import Keys
-    from google.auth.transport.requests import Request
-    from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
-    import gspread
-except ImportError as e:
-    print(f"필수 라이브러리가 설치되어 있지 않습니다: {e}")
-    sys.exit(1)
+from datetime import datetime, timedelta, timezone
+
+# 무거운 라이브러리(selenium, pandas, googleapiclient, gspread 등)는
+# 시작 비용을 줄이기 위해 해당 단계에서 지연 import 합니다.
+HEAVY_MODULES = [
+    'pandas',
+    'selenium.webdriver',
+    'google.auth.transport.requests',
+    'google.oauth2.credentials',
+    'google_auth_oauthlib.flow',
+    'googleapiclient.discovery',
+    'gspread',
+]
+
+# 한국 표준시 (명세일자 기준)
+KST = timezone(timedelta(hours=9))
+
+# 이 시간보다 오래된 작업 폴더는 중단된 실행으로 보고 정리
+STALE_WORKSPACE_HOURS = 24
+
+# 토큰 파일 (JSON 저장, 기존 token.pickle은 최초 1회 변환)
+TOKEN_FILE = 'token.json'
+LEGACY_TOKEN_FILE = 'token.pickle'
+
+# 만료 전 선제 갱신 여유 시간
+TOKEN_REFRESH_MARGIN = timedelta(minutes=10)
+
+# HTTP 연결 풀 크기
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 10
+HTTP_TIMEOUT = 60
 
 # 로깅 설정
 logging.basicConfig(
@@ -46,6 +58,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def profile_imports():
+    """무거운 라이브러리 import 소요시간 측정 (시작 비용 추적용)"""
+    logger.info("⏱️ import 프로파일 모드")
+    total_start = time.perf_counter()
+
+    for module_name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"  {module_name}: {elapsed_ms:.1f}ms")
+        except ImportError as e:
+            logger.warning(f"  {module_name}: import 실패 ({e})")
+
+    total_ms = (time.perf_counter() - total_start) * 1000
+    logger.info(f"⏱️ 총 import 시간: {total_ms:.1f}ms")
+
+def load_discovery_document(service_name, version):
+    """discovery 문서 로드 (라이브러리 내장 문서, 없으면 네트워크)"""
+    # 라이브러리 내장 문서 (설치된 googleapiclient 버전과 항상 일치)
+    content = None
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        content = get_static_doc(service_name, version)
+    except ImportError:
+        pass
+
+    # 네트워크에서 받기
+    if not content:
+        import urllib.request
+        url = f"https://{service_name}.googleapis.com/$discovery/rest?version={version}"
+        logger.info(f"discovery 문서 다운로드: {url}")
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read().decode('utf-8')
+
+    return content
+
+def create_pooled_session(session=None):
+    """keep-alive 연결 풀이 설정된 requests 세션 생성"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    return session
+
+def create_authorized_session(creds, token_session):
+    """Gmail/Sheets가 함께 쓰는 인증 세션 생성 (토큰 갱신은 token_session 사용)"""
+    from google.auth.transport.requests import AuthorizedSession, Request
+
+    session = AuthorizedSession(creds, auth_request=Request(token_session))
+    return create_pooled_session(session)
+
+class SessionHttp:
+    """requests 세션을 googleapiclient의 httplib2 인터페이스로 감싼 어댑터"""
+
+    # requests가 이미 처리한 헤더 (httplib2 응답에 넘기지 않음)
+    HOP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def __init__(self, session, timeout=HTTP_TIMEOUT):
+        self.session = session
+        self.timeout = timeout
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=5, connection_type=None):
+        import httplib2
+
+        response = self.session.request(
+            method, uri, data=body, headers=headers, timeout=self.timeout
+        )
+
+        info = {
+            key.lower(): value for key, value in response.headers.items()
+            if key.lower() not in self.HOP_HEADERS
+        }
+        info['status'] = str(response.status_code)
+
+        resp = httplib2.Response(info)
+        resp.reason = response.reason
+        return resp, response.content
+
+def build_gmail_service(session):
+    """내장 discovery 문서와 공유 세션으로 Gmail 클라이언트 생성"""
+    from googleapiclient.discovery import build_from_document
+
+    document = load_discovery_document('gmail', 'v1')
+    return build_from_document(document, http=SessionHttp(session))
+
+def build_gspread_client(creds, session):
+    """공유 세션으로 gspread 클라이언트 생성"""
+    import gspread
+    from gspread.http_client import HTTPClient
+
+    return gspread.authorize(creds, http_client=lambda auth: HTTPClient(auth, session=session))
+
 class HyundaiCardBot:
     """현대카드 OAuth 자동화 봇"""
     
@@ -62,74 +170,106 @@ class HyundaiCardBot:
             'https://www.googleapis.com/auth/drive'
         ]
         
-        # 다운로드 경로
-        self.download_path = os.path.join(os.path.expanduser("~"), "Downloads", "hyundai_auto")
+        # 실행별 작업 폴더 (다운로드 경로)
+        self.base_path = os.path.join(os.path.expanduser("~"), "Downloads", "hyundai_auto")
+        self.runs_path = os.path.join(self.base_path, "runs")
+        self.run_id = f"{datetime.now(KST):%Y%m%d_%H%M%S}_{os.getpid()}"
+        self.download_path = os.path.join(self.runs_path, self.run_id)
         os.makedirs(self.download_path, exist_ok=True)
         
+        # 처리 중인 이메일 ID (run에서 설정)
+        self.message_id = None
+        
+        # 토큰 갱신용 HTTP 세션 (authenticate에서 생성)
+        self.token_session = None
+        
+        # 명세일자 (이메일 수신일, download_html_attachment에서 설정)
+        self.statement_date = None
+        
         # CI 환경 감지
         self.is_ci = os.environ.get('CI') == 'true' or os.environ.get('GITHUB_ACTIONS') == 'true'
         
         logger.info("🏢 라포랩스 현대카드 자동화 봇 시작")
         logger.info(f"환경: {'CI (GitHub Actions)' if self.is_ci else 'Local'}")
-        logger.info(f"다운로드 경로: {self.download_path}")
+        logger.info(f"작업 경로: {self.download_path}")
         
     def authenticate(self):
         """OAuth 2.0 인증"""
         logger.info("🔐 OAuth 인증 중...")
         
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        
+        # 토큰 갱신용 세션 (연결 재사용)
+        if self.token_session is None:
+            self.token_session = create_pooled_session()
+        
         creds = None
+        changed = False
         
         # 기존 토큰 확인
-        if os.path.exists('token.pickle'):
+        if os.path.exists(TOKEN_FILE):
             try:
-                with open('token.pickle', 'rb') as token:
-                    creds = pickle.load(token)
+                creds = Credentials.from_authorized_user_file(TOKEN_FILE, self.SCOPES)
                 logger.info("✅ 기존 토큰 로드 완료")
             except Exception as e:
                 logger.warning(f"기존 토큰 로드 실패: {e}")
-                if os.path.exists('token.pickle'):
-                    os.remove('token.pickle')
+                os.remove(TOKEN_FILE)
         
-        # 토큰 갱신 또는 새 인증
+        if creds is None and os.path.exists(LEGACY_TOKEN_FILE):
+            # 기존 pickle 토큰은 JSON으로 변환
+            try:
+                with open(LEGACY_TOKEN_FILE, 'rb') as token:
+                    creds = pickle.load(token)
+                changed = True
+                logger.info(f"✅ 기존 토큰 로드 완료 ({LEGACY_TOKEN_FILE} → {TOKEN_FILE} 변환)")
+            except Exception as e:
+                logger.warning(f"기존 토큰 로드 실패: {e}")
+        
+        # 만료 임박 토큰은 미리 갱신
+        if creds and creds.refresh_token and self._needs_refresh(creds):
+            try:
+                logger.info("🔄 토큰 갱신 중...")
+                creds.refresh(Request(self.token_session))
+                changed = True
+                logger.info("✅ 토큰 갱신 완료")
+            except Exception as e:
+                logger.warning(f"토큰 갱신 실패: {e}")
+                creds = None
+        
+        # 새 인증
         if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    logger.info("🔄 토큰 갱신 중...")
-                    creds.refresh(Request())
-                    logger.info("✅ 토큰 갱신 완료")
-                except Exception as e:
-                    logger.warning(f"토큰 갱신 실패: {e}")
-                    creds = None
+            logger.info("새 OAuth 인증 시작...")
             
-            if not creds or not creds.valid:
-                logger.info("새 OAuth 인증 시작...")
-                
-                # 클라이언트 자격증명 파일 찾기
-                client_files = ['client_secret.json', 'credentials.json', 'oauth_credentials.json']
-                client_file = None
-                
-                for file in client_files:
-                    if os.path.exists(file):
-                        client_file = file
-                        logger.info(f"OAuth 파일 발견: {client_file}")
-                        break
-                
-                if not client_file:
-                    logger.error("OAuth 클라이언트 자격증명 파일을 찾을 수 없습니다!")
-                    return None
-                
-                try:
-                    flow = InstalledAppFlow.from_client_secrets_file(client_file, self.SCOPES)
-                    creds = flow.run_local_server(port=0)
-                    logger.info("✅ 새 인증 완료")
-                except Exception as e:
-                    logger.error(f"OAuth 인증 실패: {e}")
-                    return None
+            # 클라이언트 자격증명 파일 찾기
+            client_files = ['client_secret.json', 'credentials.json', 'oauth_credentials.json']
+            client_file = None
+            
+            for file in client_files:
+                if os.path.exists(file):
+                    client_file = file
+                    logger.info(f"OAuth 파일 발견: {client_file}")
+                    break
+            
+            if not client_file:
+                logger.error("OAuth 클라이언트 자격증명 파일을 찾을 수 없습니다!")
+                return None
             
-            # 토큰 저장
             try:
-                with open('token.pickle', 'wb') as token:
-                    pickle.dump(creds, token)
+                flow = InstalledAppFlow.from_client_secrets_file(client_file, self.SCOPES)
+                creds = flow.run_local_server(port=0)
+                changed = True
+                logger.info("✅ 새 인증 완료")
+            except Exception as e:
+                logger.error(f"OAuth 인증 실패: {e}")
+                return None
+        
+        # 토큰 저장 (변경된 경우만)
+        if changed:
+            try:
+                with open(TOKEN_FILE, 'w', encoding='utf-8') as token:
+                    token.write(creds.to_json())
                 logger.info("토큰 저장 완료")
             except Exception as e:
                 logger.error(f"토큰 저장 실패: {e}")
@@ -137,6 +277,17 @@ class HyundaiCardBot:
         logger.info("✅ OAuth 인증 완료")
         return creds
     
+    def _needs_refresh(self, creds):
+        """토큰이 만료되었거나 곧 만료되는지 확인"""
+        if not creds.valid:
+            return True
+        if not creds.expiry:
+            return False
+        
+        # google-auth는 timezone 없는 UTC datetime 사용
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < TOKEN_REFRESH_MARGIN
+    
     def find_hyundai_email(self, gmail_service):
         """현대카드 이메일 찾기"""
         try:
@@ -211,6 +362,12 @@ class HyundaiCardBot:
             logger.info(f"📧 제목: {subject}")
             logger.info(f"📧 발신자: {sender}")
             
+            # 이메일 수신일을 명세일자로 사용
+            internal_date = message.get('internalDate')
+            if internal_date:
+                self.statement_date = datetime.fromtimestamp(int(internal_date) / 1000, tz=KST).date()
+                logger.info(f"📅 명세일자: {self.statement_date}")
+            
             # HTML 첨부파일 찾기
             def find_html_attachment(part):
                 if part.get('filename') and part.get('filename').lower().endswith(('.html', '.htm')):
@@ -268,6 +425,14 @@ class HyundaiCardBot:
         try:
             logger.info("🔐 보안메일 처리 시작...")
             
+            from selenium import webdriver
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support.ui import WebDriverWait
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.webdriver.chrome.options import Options
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.common.keys import Keys
+            
             # HTML 파일 유효성 확인
             file_size = os.path.getsize(html_file)
             logger.info(f"📄 파일 크기: {file_size} bytes")
@@ -554,6 +719,8 @@ class HyundaiCardBot:
         try:
             logger.info(f"📦 ZIP 파일 처리: {os.path.basename(zip_file)}")
             
+            import pandas as pd
+            
             zip_path = Path(zip_file)
             extract_path = zip_path.parent / f"{zip_path.stem}_extracted"
             
@@ -610,11 +777,27 @@ class HyundaiCardBot:
             traceback.print_exc()
             return None
     
+    def save_history(self, data):
+        """보유내역 스냅샷을 로컬 히스토리 저장소에 추가"""
+        try:
+            from holdings_history import HoldingsHistoryStore
+            
+            statement_date = self.statement_date or datetime.now(KST).date()
+            store = HoldingsHistoryStore()
+            store.append(data, statement_date)
+            return True
+            
+        except Exception as e:
+            logger.warning(f"⚠️ 히스토리 저장 실패: {e}")
+            return False
+    
     def update_spreadsheet(self, gspread_client, data):
         """구글 스프레드시트 업데이트"""
         try:
             logger.info("📝 구글 스프레드시트 업데이트...")
             
+            import pandas as pd
+            
             spreadsheet = gspread_client.open_by_key(self.SPREADSHEET_ID)
             
             try:
@@ -647,6 +830,48 @@ class HyundaiCardBot:
             logger.error(f"❌ 스프레드시트 업데이트 실패: {e}")
             return False
     
+    def archive_workspace(self, store, workspace, run_id, message_id=None):
+        """작업 폴더의 산출물을 저장소에 보관한 뒤 폴더 삭제"""
+        import shutil
+        
+        archived = 0
+        for entry in os.scandir(workspace):
+            # 압축 해제 폴더, 미완료 다운로드는 보관하지 않음
+            if not entry.is_file() or entry.name.endswith('.crdownload'):
+                continue
+            try:
+                store.add(entry.path, run_id, message_id)
+                archived += 1
+            except Exception as e:
+                logger.warning(f"산출물 보관 실패 ({entry.name}): {e}")
+        
+        shutil.rmtree(workspace, ignore_errors=True)
+        return archived
+    
+    def cleanup_workspaces(self):
+        """현재/중단된 실행의 작업 폴더 정리 및 저장소 용량 제한 적용"""
+        try:
+            from artifact_store import ArtifactStore
+            
+            store = ArtifactStore(os.path.join(self.base_path, "artifacts"))
+            
+            # 현재 실행
+            if os.path.isdir(self.download_path):
+                archived = self.archive_workspace(store, self.download_path, self.run_id, self.message_id)
+                logger.info(f"📦 산출물 {archived}개 보관 (실행 ID: {self.run_id})")
+            
+            # 중단된 이전 실행 (동시 실행 중인 폴더는 건드리지 않도록 오래된 것만)
+            cutoff = time.time() - STALE_WORKSPACE_HOURS * 3600
+            for entry in os.scandir(self.runs_path):
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    logger.info(f"중단된 작업 폴더 정리: {entry.name}")
+                    self.archive_workspace(store, entry.path, entry.name)
+            
+            store.enforce_limits()
+            
+        except Exception as e:
+            logger.warning(f"⚠️ 작업 폴더 정리 실패: {e}")
+    
     def run(self):
         """전체 자동화 실행"""
         logger.info("🚀 현대카드 자동화 시작!")
@@ -663,14 +888,16 @@ class HyundaiCardBot:
             
             # 2. Google 서비스 생성
             logger.info("\n2️⃣ Google 서비스 연결...")
-            gmail_service = build('gmail', 'v1', credentials=creds)
-            gspread_client = gspread.authorize(creds)
+            session = create_authorized_session(creds, self.token_session)
+            gmail_service = build_gmail_service(session)
+            gspread_client = build_gspread_client(creds, session)
             
             # 3. 이메일 검색
             logger.info("\n3️⃣ 현대카드 이메일 검색...")
             message_id = self.find_hyundai_email(gmail_service)
             if not message_id:
                 return False
+            self.message_id = message_id
             
             # 4. HTML 다운로드
             logger.info("\n4️⃣ HTML 첨부파일 다운로드...")
@@ -690,6 +917,9 @@ class HyundaiCardBot:
             if data is None:
                 return False
             
+            # 히스토리 저장 (실패해도 계속 진행)
+            self.save_history(data)
+            
             # 7. 스프레드시트 업데이트
             logger.info("\n7️⃣ 스프레드시트 업데이트...")
             success = self.update_spreadsheet(gspread_client, data)
@@ -710,6 +940,8 @@ class HyundaiCardBot:
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            self.cleanup_workspaces()
 
 def main():
     """메인 실행 함수"""
@@ -717,6 +949,10 @@ def main():
     logger.info("📧 Gmail → HTML → 보안메일 → Google Sheets")
     logger.info("="*50)
     
+    if '--profile-imports' in sys.argv or os.environ.get('HYUNDAI_PROFILE_IMPORTS') == '1':
+        profile_imports()
+        return
+    
     try:
         bot = HyundaiCardBot()
         success = bot.run()